@@ -3,9 +3,14 @@
 import random
 import time
 import pandas as pd
-from db_manager import get_all_apostas, update_aposta_resultado, update_saldo, get_latest_saldo
+from db_manager import get_all_apostas
+from settlement_journal import novo_dono, registrar_lote, aplicar_lote, recuperar_lotes_pendentes
 
 def run_result_automation():
+    # 0. Concluir lotes parados (dono caiu e o lease venceu). Roda a cada execução:
+    # um lote deixado por um restart recente só vence o lease depois.
+    recuperar_lotes_pendentes()
+
     # 1. Obter todas as apostas
     df_apostas = get_all_apostas()
 
@@ -19,7 +24,7 @@ def run_result_automation():
     if apostas_abertas.empty:
         return 0
 
-    updated_count = 0
+    liquidacoes = []
 
     # 3. Simular a verificação de resultados para cada aposta
     for index, aposta in apostas_abertas.iterrows():
@@ -51,16 +56,15 @@ def run_result_automation():
             valor_retorno = 0.00
             lucro = -valor_apostado
 
-        # 6. Atualizar o banco de dados
-        
-        # Aposta
-        update_aposta_resultado(aposta['ID_Aposta'], status_final, valor_retorno)
-        
-        # Saldo
-        saldo_atual = get_latest_saldo(casa_aposta)
-        novo_saldo_final = saldo_atual + valor_retorno
-        update_saldo(casa_aposta, novo_saldo_final)
+        # status_anterior: o lote só aplica se a aposta ainda estiver como foi lida aqui
+        liquidacoes.append({'aposta_id': aposta['ID_Aposta'], 'status': status_final, 'valor_retorno': valor_retorno,
+                            'status_anterior': aposta['Status']})
 
-        updated_count += 1
+    # 6. Atualizar o banco de dados
+    # O lote é gravado no journal antes de ser aplicado; cada aposta e seu crédito
+    # no saldo são aplicados juntos, então uma queda no meio é recuperável.
+    dono = novo_dono()
+    lote_id = registrar_lote(liquidacoes, dono)
+    updated_count = aplicar_lote(lote_id, dono)
 
     return updated_count
@@ -1,11 +1,19 @@
 # db_manager.py (VERSÃO FINAL 1.3 - CORREÇÃO DE KEYERROR)
 
 import sqlite3
+import threading
 from datetime import datetime
 import pandas as pd
+from exposure_index import ExposureIndex
 
 DATABASE_NAME = 'bet_manager.db'
 
+# Índice de exposição das apostas pendentes (compartilhado pelo processo, carregado sob demanda).
+# O lock cobre a carga inicial e as atualizações feitas por insert/update, para que nenhuma
+# aposta gravada durante a carga fique de fora.
+_exposure_index = None
+_exposure_lock = threading.Lock()
+
 def setup_database():
     """
     Cria o banco de dados e as tabelas (saldos e apostas) se elas não existirem.
@@ -41,6 +49,33 @@ def setup_database():
         )
     """)
 
+    # Journal de liquidação (write-ahead): lotes e as mudanças pretendidas de cada lote
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lotes_liquidacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL DEFAULT 'PENDENTE',
+            dono TEXT,
+            heartbeat TEXT,
+            data_criacao TEXT NOT NULL,
+            data_conclusao TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS journal_liquidacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lote_id INTEGER NOT NULL,
+            aposta_id INTEGER NOT NULL,
+            casa TEXT NOT NULL,
+            status_anterior TEXT NOT NULL,
+            valor_retorno_anterior REAL NOT NULL,
+            status_novo TEXT NOT NULL,
+            valor_retorno_novo REAL NOT NULL,
+            situacao TEXT NOT NULL DEFAULT 'PENDENTE'
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lotes_status ON lotes_liquidacao (status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_journal_lote ON journal_liquidacao (lote_id)")
+
     conn.commit()
     conn.close()
 
@@ -71,17 +106,25 @@ def get_latest_saldo(casa: str) -> float:
 
 def insert_aposta(casa: str, liga: str, jogo: str, mercado: str, odd: float, valor_apostado: float) -> int:
     """Insere uma nova aposta no banco de dados."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO apostas (casa, liga, jogo, mercado, odd, valor_apostado, data_registro) 
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (casa, liga, jogo, mercado, odd, valor_apostado, datetime.now().isoformat()))
-    
-    aposta_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    # O lock cobre o INSERT e o registro no índice: uma liquidação que ocorra logo após o
+    # commit só atualiza o índice depois que a aposta já foi registrada nele.
+    with _exposure_lock:
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO apostas (casa, liga, jogo, mercado, odd, valor_apostado, data_registro) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (casa, liga, jogo, mercado, odd, valor_apostado, datetime.now().isoformat()))
+        
+        aposta_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        # Mantém o índice de exposição atualizado (se já foi carregado)
+        if _exposure_index is not None:
+            _exposure_index.registrar_aposta(aposta_id, casa, jogo, mercado, odd, valor_apostado)
+
     return aposta_id
 
 def get_all_apostas() -> pd.DataFrame:
@@ -129,3 +172,54 @@ def update_aposta_resultado(aposta_id: int, status: str, valor_retorno: float):
     
     conn.commit()
     conn.close()
+
+    # Aposta liquidada deixa de contar na exposição
+    if status != 'AGUARDANDO':
+        liquidar_exposicao(aposta_id)
+
+def liquidar_exposicao(aposta_id: int):
+    """Remove a aposta do índice de exposição (se carregado). Chamar após o commit da liquidação."""
+    with _exposure_lock:
+        if _exposure_index is not None:
+            _exposure_index.liquidar_aposta(aposta_id)
+
+def registrar_exposicao_pendente(aposta_id: int):
+    """
+    Devolve a aposta ao índice de exposição (se carregado), desde que ela ainda esteja
+    AGUARDANDO no banco. Usado quando uma liquidação é desfeita.
+    """
+    with _exposure_lock:
+        if _exposure_index is None:
+            return
+
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute("SELECT casa, jogo, mercado, odd, valor_apostado FROM apostas WHERE id = ? AND status = 'AGUARDANDO'", (aposta_id,))
+        aposta = cursor.fetchone()
+        conn.close()
+
+        if aposta:
+            _exposure_index.registrar_aposta(aposta_id, *aposta)
+
+def get_exposure_index() -> ExposureIndex:
+    """
+    Retorna o índice de exposição das apostas AGUARDANDO.
+    Na primeira chamada carrega as apostas pendentes do banco; depois disso o índice
+    é mantido incrementalmente por insert_aposta e update_aposta_resultado.
+    """
+    global _exposure_index
+    with _exposure_lock:
+        if _exposure_index is None:
+            conn = sqlite3.connect(DATABASE_NAME)
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT id, casa, jogo, mercado, odd, valor_apostado FROM apostas WHERE status = 'AGUARDANDO'")
+            pendentes = cursor.fetchall()
+            conn.close()
+            
+            index = ExposureIndex()
+            for aposta_id, casa, jogo, mercado, odd, valor_apostado in pendentes:
+                index.registrar_aposta(aposta_id, casa, jogo, mercado, odd, valor_apostado)
+            _exposure_index = index
+
+        return _exposure_index
@@ -0,0 +1,134 @@
+# exposure_index.py (ÍNDICE DE EXPOSIÇÃO DAS APOSTAS PENDENTES)
+
+import threading
+
+# Dimensões mantidas pelo índice (mesmos nomes das colunas de get_all_apostas)
+DIMENSOES = ['Casa', 'Jogo', 'Mercado']
+
+
+class ExposureIndex:
+    """
+    Índice incremental da exposição das apostas AGUARDANDO.
+    Para cada dimensão (Casa, Jogo, Mercado) mantém, por chave, o total apostado
+    (Valor_Apostado), o retorno potencial (Valor_Apostado * Odd) e a quantidade de
+    apostas. Registro, liquidação e consultas são O(1).
+    A chave de 'Jogo' é o texto do confronto (a tabela apostas não guarda a data
+    do evento), então o mesmo confronto em datas diferentes é somado junto.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._apostas = {}  # aposta_id -> (chaves por dimensão, stake, retorno potencial)
+        self._totais = {dim: {} for dim in DIMENSOES}
+        self._limites = {dim: {} for dim in DIMENSOES}  # chave None = limite padrão da dimensão
+        self._alertas = {}  # (dimensão, chave) -> mensagem
+
+    def registrar_aposta(self, aposta_id: int, casa: str, jogo: str, mercado: str, odd: float, valor_apostado: float) -> list:
+        """
+        Adiciona uma aposta pendente ao índice.
+        Retorna a lista de alertas de limite disparados por esta aposta.
+        """
+        chaves = {'Casa': casa, 'Jogo': jogo, 'Mercado': mercado}
+        stake = float(valor_apostado)
+        retorno = stake * float(odd)
+
+        with self._lock:
+            if aposta_id in self._apostas:
+                return []
+            self._apostas[aposta_id] = (chaves, stake, retorno)
+
+            novos_alertas = []
+            for dim, chave in chaves.items():
+                total = self._totais[dim].setdefault(chave, [0.00, 0.00, 0])
+                total[0] += stake
+                total[1] += retorno
+                total[2] += 1
+                alerta = self._verificar_limite(dim, chave)
+                if alerta:
+                    novos_alertas.append(alerta)
+            return novos_alertas
+
+    def liquidar_aposta(self, aposta_id: int) -> bool:
+        """Remove uma aposta do índice (liquidada). Retorna False se ela não estava pendente."""
+        with self._lock:
+            registro = self._apostas.pop(aposta_id, None)
+            if registro is None:
+                return False
+
+            chaves, stake, retorno = registro
+            for dim, chave in chaves.items():
+                total = self._totais[dim][chave]
+                total[0] -= stake
+                total[1] -= retorno
+                total[2] -= 1
+                if total[2] == 0:
+                    del self._totais[dim][chave]
+                self._verificar_limite(dim, chave)
+            return True
+
+    def definir_limite(self, dimensao: str, limite: float, chave: str = None):
+        """
+        Define o limite de retorno potencial (R$) de uma dimensão.
+        Com chave=None o limite vale para todas as chaves sem limite próprio.
+        Use limite=None para removê-lo.
+        """
+        if dimensao not in DIMENSOES:
+            raise ValueError(f"Dimensão inválida: {dimensao}")
+
+        with self._lock:
+            if limite is None:
+                self._limites[dimensao].pop(chave, None)
+            else:
+                self._limites[dimensao][chave] = float(limite)
+
+            # Reavalia as chaves afetadas pelo novo limite
+            afetadas = list(self._totais[dimensao]) if chave is None else [chave]
+            afetadas += [c for (d, c) in self._alertas if d == dimensao and c not in afetadas]
+            for c in afetadas:
+                self._verificar_limite(dimensao, c)
+
+    def limite(self, dimensao: str, chave: str = None):
+        """Limite configurado para a chave (ou o padrão da dimensão), ou None."""
+        with self._lock:
+            return self._limites[dimensao].get(chave, self._limites[dimensao].get(None))
+
+    def exposicao(self, dimensao: str, chave: str) -> dict:
+        """Exposição atual de uma chave: Valor_Apostado, Retorno_Potencial e Qtd_Apostas."""
+        with self._lock:
+            stake, retorno, qtd = self._totais[dimensao].get(chave, (0.00, 0.00, 0))
+        return {'Valor_Apostado': stake, 'Retorno_Potencial': retorno, 'Qtd_Apostas': qtd}
+
+    def exposicao_por(self, dimensao: str) -> dict:
+        """Exposição de todas as chaves de uma dimensão: {chave: exposicao}."""
+        with self._lock:
+            return {
+                chave: {'Valor_Apostado': stake, 'Retorno_Potencial': retorno, 'Qtd_Apostas': qtd}
+                for chave, (stake, retorno, qtd) in self._totais[dimensao].items()
+            }
+
+    def alertas(self) -> list:
+        """Alertas de limite atualmente ativos."""
+        with self._lock:
+            return list(self._alertas.values())
+
+    def limpar(self):
+        """Esvazia o índice (mantém os limites configurados)."""
+        with self._lock:
+            self._apostas.clear()
+            self._totais = {dim: {} for dim in DIMENSOES}
+            self._alertas.clear()
+
+    def _verificar_limite(self, dim: str, chave: str):
+        # Chamado com o lock adquirido. Atualiza o alerta da chave e o retorna se disparou agora.
+        limite = self._limites[dim].get(chave, self._limites[dim].get(None))
+        retorno = self._totais[dim].get(chave, (0.00, 0.00, 0))[1]
+
+        if limite is not None and retorno > limite:
+            ja_ativo = (dim, chave) in self._alertas
+            self._alertas[(dim, chave)] = (
+                f"{dim} '{chave}': retorno potencial de R$ {retorno:.2f} acima do limite de R$ {limite:.2f}"
+            )
+            return None if ja_ativo else self._alertas[(dim, chave)]
+
+        self._alertas.pop((dim, chave), None)
+        return None
@@ -0,0 +1,268 @@
+# load_test.py (GERADOR DE CARGA: USUÁRIOS CONCORRENTES + JOB DE LIQUIDAÇÃO)
+#
+# Uso: python load_test.py --usuarios 50 --processos 4 --duracao 30 --mix aposta=0.3,refresh=0.63,resolucao=0.05,odds=0.02
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import db_manager
+import odds_cache
+from db_manager import setup_database, get_latest_saldo, update_saldo, insert_aposta, get_all_apostas, update_aposta_resultado
+from odds_cache import get_odds_snapshot, atualizar_odds_cache
+
+CASAS = ['Sportingbet', 'Superbet']
+MERCADOS = ['Vencedor da Partida (1X2)', 'Acima de 2.5 Gols', 'Ambas Marcam', 'Handicap Asiático']
+MIX_PADRAO = {'aposta': 0.30, 'refresh': 0.63, 'resolucao': 0.05, 'odds': 0.02}
+
+
+# --- Operações (espelham os fluxos do main.py) ---
+
+def _op_aposta(rng: random.Random):
+    """Registro de aposta: lê o saldo, insere a aposta e deduz o saldo."""
+    casa = rng.choice(CASAS)
+    valor = round(rng.uniform(5.00, 50.00), 2)
+    saldo_disp = get_latest_saldo(casa)
+    if valor <= saldo_disp:
+        aposta_id = insert_aposta(casa, 'Liga (Carga)', f"Jogo {rng.randint(1, 50)}", rng.choice(MERCADOS),
+                                  round(rng.uniform(1.20, 5.00), 2), valor)
+        if aposta_id:
+            update_saldo(casa, saldo_disp - valor)
+
+def _op_refresh(rng: random.Random):
+    """Rerun da sessão + refresh_data: lê o snapshot de odds, os saldos e todas as apostas."""
+    get_odds_snapshot()
+    for casa in CASAS:
+        get_latest_saldo(casa)
+    get_all_apostas()
+
+def _op_odds(rng: random.Random):
+    """Botão 'Atualizar Jogos/Odds': publica uma nova versão no cache compartilhado."""
+    atualizar_odds_cache()
+
+def _op_resolucao(rng: random.Random):
+    """Resolver Aposta Pendente: atualiza o resultado e credita o retorno no saldo."""
+    df_apostas = get_all_apostas()
+    if df_apostas.empty:
+        return
+    df_pendentes = df_apostas[df_apostas['Status'] == 'AGUARDANDO']
+    if df_pendentes.empty:
+        return
+
+    aposta = df_pendentes.iloc[rng.randrange(len(df_pendentes))]
+    novo_status = rng.choice(['GREEN', 'RED', 'CASHOUT'])
+    if novo_status == 'GREEN':
+        valor_retorno = aposta['Valor_Apostado'] * aposta['Odd']
+    elif novo_status == 'RED':
+        valor_retorno = 0.00
+    else:
+        valor_retorno = aposta['Valor_Apostado']
+
+    saldo_atual = get_latest_saldo(aposta['Casa'])
+    update_aposta_resultado(int(aposta['ID_Aposta']), novo_status, valor_retorno)
+    update_saldo(aposta['Casa'], saldo_atual + valor_retorno)
+
+OPERACOES = {'aposta': _op_aposta, 'refresh': _op_refresh, 'resolucao': _op_resolucao, 'odds': _op_odds}
+
+
+# --- Workers ---
+
+def _medir(nome: str, funcao, registros: list, *args):
+    inicio = time.perf_counter()
+    try:
+        funcao(*args)
+        erro = None
+    except sqlite3.OperationalError as e:
+        mensagem = str(e).lower()
+        erro = 'lock' if 'locked' in mensagem or 'busy' in mensagem else 'erro'
+    except Exception:
+        erro = 'erro'
+    registros.append((nome, time.perf_counter() - inicio, erro))
+
+def _loop_usuario(fim: float, mix: dict, seed: int) -> list:
+    rng = random.Random(seed)
+    nomes = list(mix)
+    pesos = [mix[n] for n in nomes]
+    registros = []
+
+    while time.time() < fim:
+        nome = rng.choices(nomes, weights=pesos, k=1)[0]
+        _medir(nome, OPERACOES[nome], registros, rng)
+    return registros
+
+def _configurar_worker(caminho_db: str, dir_odds: str, silenciar: bool = True):
+    db_manager.DATABASE_NAME = caminho_db
+    odds_cache.ODDS_CACHE_DIR = dir_odds
+    if silenciar:
+        # Processos de carga não imprimem nada (ex.: o print do bet_api a cada atualização de odds)
+        sys.stdout = open(os.devnull, 'w')
+
+def _worker_usuarios(caminho_db: str, dir_odds: str, usuarios: int, fim: float, mix: dict, seed: int) -> list:
+    """Processo com `usuarios` threads simulando sessões do Streamlit."""
+    _configurar_worker(caminho_db, dir_odds)
+    with ThreadPoolExecutor(max_workers=usuarios) as executor:
+        futuros = [executor.submit(_loop_usuario, fim, mix, seed + i) for i in range(usuarios)]
+        return [r for f in futuros for r in f.result()]
+
+def _worker_liquidacao(caminho_db: str, dir_odds: str, fim: float, intervalo: float) -> list:
+    """Processo que executa run_result_automation periodicamente."""
+    _configurar_worker(caminho_db, dir_odds)
+    from automation_job import run_result_automation
+
+    registros = []
+    while time.time() < fim:
+        _medir('liquidacao', run_result_automation, registros)
+        time.sleep(intervalo)
+    return registros
+
+
+# --- Consistência e Relatório ---
+
+def _banco_tem_dados(caminho_db: str) -> bool:
+    # Banco existente com apostas ou saldos (ex.: o bet_manager.db real)
+    if not os.path.exists(caminho_db) or os.path.getsize(caminho_db) == 0:
+        return False
+    conn = sqlite3.connect(caminho_db)
+    try:
+        tabelas = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return any(conn.execute(f"SELECT 1 FROM {tabela} LIMIT 1").fetchone()
+                   for tabela in ['apostas', 'saldos'] if tabela in tabelas)
+    finally:
+        conn.close()
+
+def verificar_consistencia(caminho_db: str, saldo_inicial: float) -> pd.DataFrame:
+    """
+    Confere, por casa, se saldo_final == saldo_inicial - total apostado + total retornado.
+    Diferenças indicam atualizações de saldo perdidas ou duplicadas.
+    """
+    conn = sqlite3.connect(caminho_db)
+    df = pd.read_sql_query("""
+        SELECT casa, SUM(valor_apostado) AS apostado, SUM(valor_retorno) AS retornado, COUNT(*) AS apostas
+        FROM apostas GROUP BY casa
+    """, conn).set_index('casa')
+    conn.close()
+
+    db_manager.DATABASE_NAME = caminho_db
+    linhas = []
+    for casa in CASAS:
+        apostado = df['apostado'].get(casa, 0.00)
+        retornado = df['retornado'].get(casa, 0.00)
+        esperado = saldo_inicial - apostado + retornado
+        saldo_final = get_latest_saldo(casa)
+        linhas.append({
+            'Casa': casa,
+            'Apostas': int(df['apostas'].get(casa, 0)),
+            'Saldo_Esperado': esperado,
+            'Saldo_Final': saldo_final,
+            'Diferenca': saldo_final - esperado,
+            'Violacao': abs(saldo_final - esperado) > 0.01,
+        })
+    return pd.DataFrame(linhas)
+
+def resumir(registros: list, duracao: float) -> pd.DataFrame:
+    """Throughput, latências p50/p99 (ms) e erros por operação."""
+    df = pd.DataFrame(registros, columns=['Operacao', 'Latencia', 'Erro'])
+    linhas = []
+    for operacao, grupo in df.groupby('Operacao'):
+        latencias = grupo['Latencia'].to_numpy() * 1000
+        linhas.append({
+            'Operacao': operacao,
+            'Total': len(grupo),
+            'Ops_por_Seg': len(grupo) / duracao,
+            'p50_ms': np.percentile(latencias, 50),
+            'p99_ms': np.percentile(latencias, 99),
+            'Erros_Lock': int((grupo['Erro'] == 'lock').sum()),
+            'Outros_Erros': int((grupo['Erro'] == 'erro').sum()),
+        })
+    return pd.DataFrame(linhas)
+
+def executar_teste_carga(usuarios: int = 50, processos: int = 1, duracao: float = 30.0, mix: dict = None,
+                         intervalo_liquidacao: float = 1.0, saldo_inicial: float = 1_000_000.00,
+                         caminho_db: str = None, seed: int = 0):
+    """
+    Executa o teste de carga em um banco isolado e retorna (resumo, consistencia).
+    Os usuários são divididos entre `processos` processos; o job de liquidação roda
+    em um processo próprio. O diretório temporário (banco e cache de odds) é
+    removido ao final; com `caminho_db` informado, o banco é mantido, mas ele precisa
+    estar vazio (o teste sobrescreve os saldos). Os globais de db_manager e
+    odds_cache são restaurados ao final.
+    """
+    if caminho_db and _banco_tem_dados(caminho_db):
+        raise ValueError(f"O banco {caminho_db} já tem apostas ou saldos; use um arquivo novo para o teste de carga.")
+
+    mix = mix or MIX_PADRAO
+    dir_temp = tempfile.mkdtemp(prefix='bet_load_')
+    caminho_db = caminho_db or os.path.join(dir_temp, 'bet_manager.db')
+    dir_odds = os.path.join(dir_temp, 'odds_cache')
+    globais_originais = (db_manager.DATABASE_NAME, odds_cache.ODDS_CACHE_DIR)
+
+    try:
+        _configurar_worker(caminho_db, dir_odds, silenciar=False)
+        setup_database()
+        for casa in CASAS:
+            update_saldo(casa, saldo_inicial)
+        with contextlib.redirect_stdout(io.StringIO()):
+            atualizar_odds_cache()
+
+        divisao = [usuarios // processos + (1 if i < usuarios % processos else 0) for i in range(processos)]
+        inicio = time.time()
+        fim = inicio + duracao
+
+        with ProcessPoolExecutor(max_workers=processos + 1) as executor:
+            futuros = [
+                executor.submit(_worker_usuarios, caminho_db, dir_odds, n, fim, mix, seed + 1000 * i)
+                for i, n in enumerate(divisao) if n > 0
+            ]
+            futuros.append(executor.submit(_worker_liquidacao, caminho_db, dir_odds, fim, intervalo_liquidacao))
+            registros = [r for f in futuros for r in f.result()]
+
+        duracao_real = time.time() - inicio
+        return resumir(registros, duracao_real), verificar_consistencia(caminho_db, saldo_inicial)
+    finally:
+        db_manager.DATABASE_NAME, odds_cache.ODDS_CACHE_DIR = globais_originais
+        shutil.rmtree(dir_temp, ignore_errors=True)
+
+def _parse_mix(texto: str) -> dict:
+    mix = {}
+    for parte in texto.split(','):
+        nome, peso = parte.split('=')
+        if nome.strip() not in OPERACOES:
+            raise argparse.ArgumentTypeError(f"Operação desconhecida no mix: {nome}")
+        mix[nome.strip()] = float(peso)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga do Bet Manager (db_manager + automação).")
+    parser.add_argument('--usuarios', type=int, default=50, help="Usuários simultâneos (threads)")
+    parser.add_argument('--processos', type=int, default=1, help="Processos entre os quais os usuários são divididos")
+    parser.add_argument('--duracao', type=float, default=30.0, help="Duração do teste em segundos")
+    parser.add_argument('--mix', type=_parse_mix, default=MIX_PADRAO, help="Pesos das operações, ex.: aposta=0.3,refresh=0.63,resolucao=0.05,odds=0.02")
+    parser.add_argument('--intervalo-liquidacao', type=float, default=1.0, help="Segundos entre execuções da automação")
+    parser.add_argument('--saldo-inicial', type=float, default=1_000_000.00, help="Saldo inicial de cada casa")
+    parser.add_argument('--db', default=None, help="Caminho do banco de teste (padrão: arquivo temporário)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    resumo, consistencia = executar_teste_carga(
+        usuarios=args.usuarios, processos=args.processos, duracao=args.duracao, mix=args.mix,
+        intervalo_liquidacao=args.intervalo_liquidacao, saldo_inicial=args.saldo_inicial,
+        caminho_db=args.db, seed=args.seed
+    )
+
+    print("\n=== Desempenho por Operação ===")
+    print(resumo.to_string(index=False, float_format='%.2f'))
+    print("\n=== Consistência de Saldos ===")
+    print(consistencia.to_string(index=False, float_format='%.2f'))
+    print(f"\nViolações de consistência: {int(consistencia['Violacao'].sum())}")
@@ -5,10 +5,12 @@ import pandas as pd
 from datetime import datetime, timedelta
 
 # Importamos os módulos (certifique-se de que os outros arquivos estão atualizados também!)
-from bet_api import get_all_prematch_odds
-from db_manager import setup_database, get_latest_saldo, update_saldo, insert_aposta, get_all_apostas, update_aposta_resultado
+from odds_cache import get_odds_snapshot, get_odds_refresh_time, atualizar_odds_cache, iniciar_atualizacao_automatica
+from db_manager import setup_database, get_latest_saldo, update_saldo, insert_aposta, get_all_apostas, update_aposta_resultado, get_exposure_index
 from data_processor import calculate_performance_metrics, create_profit_chart
 from automation_job import run_result_automation 
+from settlement_journal import recuperar_na_inicializacao
+from staking import RESULTADOS_ODDS, estimar_probabilidades, prob_resultado, sugerir_stakes, preparar_historico, preparar_simulacao, executar_backtests, melhores_por_estrategia
 
 # --- Configuração Inicial ---
 st.set_page_config(layout="wide", page_title="Bet Manager | Projeto Ícaro & Gemini")
@@ -16,6 +18,13 @@ st.set_page_config(layout="wide", page_title="Bet Manager | Projeto Ícaro & Gem
 # Configura o banco de dados (cria o arquivo e as tabelas, incluindo a nova coluna Prognostico).
 setup_database()
 
+# Conclui lotes de liquidação parados (ex.: queda durante a automação); repete nos reruns
+# enquanto houver lote PENDENTE (um lote de um restart recente ainda está no lease)
+recuperar_na_inicializacao()
+
+# Job único (por processo) que mantém o cache de odds compartilhado atualizado
+iniciar_atualizacao_automatica()
+
 # Função para carregar os saldos
 def load_saldos():
     return {
@@ -33,9 +42,8 @@ def refresh_data():
 if 'saldos' not in st.session_state:
     st.session_state['saldos'] = load_saldos()
     
-# Inicializa o estado da sessão para as odds e apostas
-if 'odds_data' not in st.session_state:
-    st.session_state['odds_data'] = pd.DataFrame()
+# Odds: snapshot compartilhado por todas as sessões (somente leitura, sem cópia por sessão)
+odds_data = get_odds_snapshot()
     
 # Tenta carregar apostas (com fallback)
 if 'apostas_data' not in st.session_state:
@@ -78,14 +86,55 @@ with st.sidebar:
 
     st.markdown("---")
     
+    # Exposição das apostas pendentes (índice mantido pelo db_manager)
+    st.subheader("⚠️ Exposição em Aberto")
+    exposure_index = get_exposure_index()
+    
+    # Os limites são uma configuração única do processo (compartilhada entre as sessões):
+    # só são gravados quando o usuário altera o campo, nunca a cada rerun.
+    def salvar_limite(dimensao, key):
+        exposure_index.definir_limite(dimensao, st.session_state[key] or None)
+    
+    st.number_input("Limite de Retorno por Jogo/Confronto (R$, 0 = sem limite)", min_value=0.00, value=exposure_index.limite('Jogo') or 0.00, step=50.00, format="%.2f", key='exp_limite_jogo', on_change=salvar_limite, args=('Jogo', 'exp_limite_jogo'))
+    st.number_input("Limite de Retorno por Casa (R$, 0 = sem limite)", min_value=0.00, value=exposure_index.limite('Casa') or 0.00, step=100.00, format="%.2f", key='exp_limite_casa', on_change=salvar_limite, args=('Casa', 'exp_limite_casa'))
+    st.caption(f"Limites ativos: Jogo R$ {exposure_index.limite('Jogo') or 0.00:.2f} | Casa R$ {exposure_index.limite('Casa') or 0.00:.2f} (0 = sem limite)")
+    
+    for casa in ['Sportingbet', 'Superbet']:
+        exp_casa = exposure_index.exposicao('Casa', casa)
+        st.caption(f"{casa}: R$ {exp_casa['Valor_Apostado']:.2f} em jogo | Retorno potencial R$ {exp_casa['Retorno_Potencial']:.2f} ({exp_casa['Qtd_Apostas']} apostas)")
+    
+    exp_jogos = exposure_index.exposicao_por('Jogo')
+    if exp_jogos:
+        with st.expander("Exposição por Jogo (Confronto) / Mercado"):
+            st.dataframe(pd.DataFrame.from_dict(exp_jogos, orient='index').sort_values('Retorno_Potencial', ascending=False), use_container_width=True)
+            st.dataframe(pd.DataFrame.from_dict(exposure_index.exposicao_por('Mercado'), orient='index'), use_container_width=True)
+    
+    for alerta in exposure_index.alertas():
+        st.warning(alerta)
+
+    st.markdown("---")
+    
     # Botão para atualizar dados de Odds
     if st.button("🔄 Atualizar Jogos/Odds (Busca Mensal)"):
         with st.spinner("Buscando dados (Simulação)..."):
-            st.session_state['odds_data'] = get_all_prematch_odds()
+            atualizar_odds_cache()
+            odds_data = get_odds_snapshot()
         st.success(f"Dados de Odds e Jogos simulados atualizados!")
+    
+    odds_refresh = get_odds_refresh_time()
+    if odds_refresh is not None:
+        st.caption(f"Odds atualizadas em {odds_refresh.strftime('%d/%m/%Y %H:%M')}")
         
     st.markdown("---")
     
+    # Parâmetros das estratégias de stake (usados na Aposta Rápida e no Backtest)
+    st.subheader("🎯 Estratégia de Stake")
+    st.number_input("Stake Fixa (R$)", min_value=0.01, value=10.00, step=5.00, format="%.2f", key='stk_fixa')
+    st.number_input("Percentual da Banca (%)", min_value=0.01, max_value=100.00, value=2.00, step=0.50, format="%.2f", key='stk_percentual')
+    st.number_input("Fração de Kelly", min_value=0.01, max_value=1.00, value=0.25, step=0.05, format="%.2f", key='stk_kelly')
+    
+    st.markdown("---")
+    
     # Botão para Automação de Resultados (Reativado)
     st.subheader("🤖 Automação")
     if st.button("Executar Verificação de Resultados (Simulado)"):
@@ -102,18 +151,17 @@ tab_jogos, tab_apostas, tab_performance = st.tabs(["🔥 Jogos do Mês & Odds",
 with tab_jogos:
     st.header("Odds Pré-Jogo das Casas (Busca Mensal)")
     
-    if st.session_state['odds_data'].empty:
+    if odds_data.empty:
         st.info("Clique em 'Atualizar Jogos/Odds' na barra lateral para carregar os dados do mês.")
     else:
         # --- FILTRO DE DATA ---
         hoje = datetime.now().date()
-        df_odds = st.session_state['odds_data'].copy()
         
-        # Cria a coluna de filtro
-        df_odds['Data_Apenas'] = pd.to_datetime(df_odds['Data_Hora']).dt.date
+        # Cria a série de filtro (o snapshot compartilhado não é copiado nem alterado)
+        data_apenas = pd.to_datetime(odds_data['Data_Hora']).dt.date
         
         # Filtra a data selecionada
-        datas_disponiveis = df_odds['Data_Apenas'].unique()
+        datas_disponiveis = data_apenas.unique()
         
         if len(datas_disponiveis) == 0:
             st.error("Não há datas disponíveis no dataset simulado.")
@@ -128,7 +176,7 @@ with tab_jogos:
                 max_value=max_date
             )
         
-        df_filtrado = df_odds[df_odds['Data_Apenas'] == data_selecionada]
+        df_filtrado = odds_data[data_apenas == data_selecionada]
         
         # --- LÓGICA DE FILTRO POR CASA E LIGA ---
         casas = df_filtrado['Casa'].unique()
@@ -187,9 +235,15 @@ with tab_jogos:
                         key='rap_mercado'
                     )
                     
+                    # A probabilidade estimada (e o Kelly) só existe para o 1X2 com seleção explícita
+                    resultado_1x2 = None
+                    if st.session_state['rap_mercado'] == 'Vencedor da Partida (1X2)':
+                        resultado_1x2 = st.selectbox("Resultado (1X2)", list(RESULTADOS_ODDS), key='rap_resultado_1x2')
+                    
                 with col_rapida2:
                     st.text_input("Jogo", value=row['Jogo'], disabled=True, key='rap_jogo_disp')
-                    odd_selecionada = st.number_input("Odd", min_value=1.01, step=0.01, format="%.2f", value=row['Odd_1'], key='rap_odd') 
+                    odd_padrao = row[RESULTADOS_ODDS[resultado_1x2]] if resultado_1x2 else row['Odd_1']
+                    odd_selecionada = st.number_input("Odd", min_value=1.01, step=0.01, format="%.2f", value=odd_padrao, key='rap_odd') 
                     
                 with col_rapida3:
                     valor_rapido = st.number_input("Valor Apostado (R$)", min_value=0.01, step=5.00, format="%.2f", key='rap_valor')
@@ -200,6 +254,30 @@ with tab_jogos:
                 saldo_disp = st.session_state['saldos'].get(row['Casa'], 0.00)
                 st.caption(f"Saldo Disponível em {row['Casa']}: R$ {saldo_disp:.2f}")
 
+                # --- SUGESTÃO DE STAKE POR ESTRATÉGIA ---
+                prob_estimada = None
+                if resultado_1x2:
+                    # Estima só sobre as linhas do evento (não copia o snapshot compartilhado inteiro)
+                    df_probs = estimar_probabilidades(odds_data[odds_data['ID_Evento'] == row['ID_Evento']])
+                    row_prob = df_probs[df_probs['Casa'] == row['Casa']].iloc[0]
+                    prob_estimada = prob_resultado(row_prob, resultado_1x2)
+                sugestoes = sugerir_stakes(
+                    saldo_disp, odd_selecionada, prob_estimada,
+                    valor_fixo=st.session_state['stk_fixa'],
+                    percentual=st.session_state['stk_percentual'],
+                    fracao=st.session_state['stk_kelly']
+                )
+
+                if prob_estimada is not None:
+                    st.markdown(f"**Stakes Sugeridas** (Prob. estimada de '{resultado_1x2}': {prob_estimada:.1%} | Edge: {prob_estimada * odd_selecionada - 1:+.1%})")
+                else:
+                    st.markdown("**Stakes Sugeridas** (Kelly disponível apenas para o mercado 1X2)")
+                col_stk1, col_stk2, col_stk3 = st.columns(3)
+                col_stk1.metric("Fixa", f"R$ {sugestoes['Fixa']:.2f}")
+                col_stk2.metric(f"Percentual ({st.session_state['stk_percentual']:.2f}%)", f"R$ {sugestoes['Percentual']:.2f}")
+                if 'Kelly' in sugestoes:
+                    col_stk3.metric(f"Kelly ({st.session_state['stk_kelly']:.2f}x)", f"R$ {sugestoes['Kelly']:.2f}")
+
                 if st.button(f"✅ Registrar Aposta de R$ {valor_rapido:.2f}", key='btn_rapida'):
                     if valor_rapido > 0 and valor_rapido <= saldo_disp and rap_prognostico:
                         
@@ -395,3 +473,27 @@ with tab_performance:
         # Gerar o gráfico
         fig = create_profit_chart(df_apostas)
         st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("🧪 Backtest de Estratégias de Stake")
+
+    col_bt1, col_bt2 = st.columns(2)
+    with col_bt1:
+        fonte_bt = st.radio("Fonte dos Dados", ['Histórico de Apostas', 'Odds Simuladas'], horizontal=True, key='bt_fonte')
+    with col_bt2:
+        banca_bt = st.number_input("Banca Inicial (R$)", min_value=1.00, value=1000.00, step=100.00, format="%.2f", key='bt_banca')
+
+    if st.button("▶️ Executar Backtest", key='btn_backtest'):
+        if fonte_bt == 'Histórico de Apostas':
+            odds_bt, probs_bt, resultados_bt = preparar_historico(df_apostas)
+        else:
+            odds_bt, probs_bt, resultados_bt = preparar_simulacao(odds_data)
+
+        if len(odds_bt) == 0:
+            st.info("Sem dados para o backtest. Registre apostas resolvidas ou atualize as odds.")
+        else:
+            df_backtest = executar_backtests(odds_bt, probs_bt, resultados_bt, banca_inicial=banca_bt)
+            st.caption(f"{len(df_backtest)} combinações testadas sobre {len(odds_bt)} apostas.")
+            st.markdown("**Melhor parâmetro por estratégia**")
+            st.dataframe(melhores_por_estrategia(df_backtest), use_container_width=True, hide_index=True)
+            st.dataframe(df_backtest.sort_values('Banca_Final', ascending=False), use_container_width=True, hide_index=True)
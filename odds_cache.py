@@ -0,0 +1,209 @@
+# odds_cache.py (CACHE DE ODDS COMPARTILHADO ENTRE SESSÕES - MEMORY-MAPPED)
+
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from bet_api import get_all_prematch_odds
+
+ODDS_CACHE_DIR = 'odds_cache'
+ARQUIVO_VERSAO = 'CURRENT'
+VERSOES_MANTIDAS = 2  # a versão anterior é mantida para leitores que ainda a usam
+TENTATIVAS_LEITURA = 3  # releituras do CURRENT se a versão for apagada durante a carga
+
+# Lock files (entre processos): um só processo é o "refresher" e uma só escrita ocorre por vez
+LOCK_REFRESHER = '.refresher.lock'
+LOCK_ESCRITA = '.escrita.lock'
+
+# Snapshot carregado neste processo: (versao, DataFrame). Todas as sessões leem o mesmo objeto.
+_snapshot = (None, pd.DataFrame())
+_snapshot_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_thread_lock = threading.Lock()
+_refresh_thread = None
+
+
+def _adquirir_lock_arquivo(nome: str, bloqueante: bool = True):
+    """
+    Lock exclusivo em um arquivo do cache. Retorna o arquivo aberto.
+    Não bloqueante: retorna None se o lock está ocupado. Bloqueante: propaga o
+    OSError se o lock não puder ser obtido (ex.: timeout do msvcrt no Windows).
+    """
+    os.makedirs(ODDS_CACHE_DIR, exist_ok=True)
+    f = open(os.path.join(ODDS_CACHE_DIR, nome), 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if bloqueante else fcntl.LOCK_NB))
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if bloqueante else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        if bloqueante:
+            raise
+        return None
+    return f
+
+def _liberar_lock_arquivo(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    f.close()
+
+
+def _salvar_snapshot(df_odds: pd.DataFrame, versao: str):
+    """
+    Grava cada coluna como um arquivo .npy no diretório da versão.
+    Colunas numéricas são gravadas direto; colunas de texto são codificadas como
+    categorias (códigos inteiros + lista de categorias): os códigos são mapeados e só a
+    lista de categorias (poucos valores distintos) é carregada na memória.
+    """
+    tmp_dir = os.path.join(ODDS_CACHE_DIR, f".tmp_{versao}")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    for coluna in df_odds.columns:
+        serie = df_odds[coluna]
+        if pd.api.types.is_numeric_dtype(serie):
+            np.save(os.path.join(tmp_dir, f"{coluna}.npy"), serie.to_numpy())
+        else:
+            # Os códigos já saem no dtype que o pandas usa (int8/int16/...), evitando cópia na leitura
+            categorico = pd.Categorical(serie.to_numpy(dtype=str))
+            np.save(os.path.join(tmp_dir, f"{coluna}.codigos.npy"), categorico.codes)
+            np.save(os.path.join(tmp_dir, f"{coluna}.categorias.npy"), categorico.categories.to_numpy(dtype=str))
+
+    with open(os.path.join(tmp_dir, 'colunas.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(df_odds.columns))
+
+    # Publica a versão de forma atômica: rename do diretório e troca do ponteiro CURRENT
+    os.replace(tmp_dir, os.path.join(ODDS_CACHE_DIR, versao))
+    ponteiro_tmp = os.path.join(ODDS_CACHE_DIR, f".{ARQUIVO_VERSAO}.tmp")
+    with open(ponteiro_tmp, 'w', encoding='utf-8') as f:
+        f.write(versao)
+    os.replace(ponteiro_tmp, os.path.join(ODDS_CACHE_DIR, ARQUIVO_VERSAO))
+
+def _carregar_snapshot(versao: str) -> pd.DataFrame:
+    """
+    Monta o DataFrame da versão a partir dos arquivos mapeados em memória.
+    Colunas numéricas e códigos das categorias não são copiados; apenas as listas de
+    categorias são lidas para a memória.
+    """
+    versao_dir = os.path.join(ODDS_CACHE_DIR, versao)
+    with open(os.path.join(versao_dir, 'colunas.txt'), encoding='utf-8') as f:
+        colunas = f.read().split('\n')
+
+    dados = {}
+    for coluna in colunas:
+        caminho = os.path.join(versao_dir, f"{coluna}.npy")
+        if os.path.exists(caminho):
+            dados[coluna] = np.load(caminho, mmap_mode='r')
+        else:
+            codigos = np.load(os.path.join(versao_dir, f"{coluna}.codigos.npy"), mmap_mode='r')
+            categorias = np.load(os.path.join(versao_dir, f"{coluna}.categorias.npy"))
+            # validate=False evita a cópia dos códigos (gravados pelo próprio pd.Categorical)
+            dtype = pd.CategoricalDtype(categories=categorias)
+            dados[coluna] = pd.Categorical.from_codes(codigos, dtype=dtype, validate=False)
+
+    return pd.DataFrame(dados, copy=False)
+
+def _limpar_versoes_antigas(versao_atual: str):
+    versoes = sorted(v for v in os.listdir(ODDS_CACHE_DIR) if not v.startswith('.') and v != ARQUIVO_VERSAO)
+    for versao in versoes[:-VERSOES_MANTIDAS]:
+        if versao != versao_atual:
+            shutil.rmtree(os.path.join(ODDS_CACHE_DIR, versao), ignore_errors=True)
+
+def versao_atual():
+    """Versão (timestamp do refresh) publicada no cache, ou None se ainda não existe."""
+    try:
+        with open(os.path.join(ODDS_CACHE_DIR, ARQUIVO_VERSAO), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def atualizar_odds_cache() -> str:
+    """Busca as odds, publica uma nova versão no cache e retorna a versão criada."""
+    with _refresh_lock:
+        df_odds = get_all_prematch_odds()
+
+        lock = _adquirir_lock_arquivo(LOCK_ESCRITA)
+        try:
+            versao = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            _salvar_snapshot(df_odds, versao)
+            _limpar_versoes_antigas(versao)
+        finally:
+            _liberar_lock_arquivo(lock)
+        return versao
+
+def get_odds_snapshot() -> pd.DataFrame:
+    """
+    Retorna o snapshot de odds compartilhado pelo processo.
+    Recarrega (mapeando os arquivos) apenas quando a versão publicada muda.
+    Se a versão lida do CURRENT for apagada durante a carga (dois refreshes seguidos),
+    relê o CURRENT e tenta de novo com a versão nova.
+    O DataFrame é somente leitura: use .copy() antes de alterá-lo.
+    """
+    global _snapshot
+    for tentativa in range(TENTATIVAS_LEITURA):
+        versao = versao_atual()
+        if versao is None or _snapshot[0] == versao:
+            return _snapshot[1]
+
+        with _snapshot_lock:
+            if _snapshot[0] != versao:
+                try:
+                    _snapshot = (versao, _carregar_snapshot(versao))
+                except FileNotFoundError:
+                    if tentativa == TENTATIVAS_LEITURA - 1:
+                        raise
+                    continue
+        return _snapshot[1]
+
+def get_odds_refresh_time():
+    """Data/hora do refresh do snapshot publicado, ou None."""
+    versao = versao_atual()
+    return datetime.strptime(versao, '%Y%m%d%H%M%S%f') if versao else None
+
+def _loop_atualizacao(intervalo_segundos: float):
+    # Só o processo que detém o lock do refresher atualiza; os demais tentam assumir
+    # periodicamente (o lock é liberado pelo sistema se o processo dono morrer).
+    lock_refresher = None
+    while True:
+        if lock_refresher is None:
+            lock_refresher = _adquirir_lock_arquivo(LOCK_REFRESHER, bloqueante=False)
+
+        if lock_refresher is not None:
+            ultima = get_odds_refresh_time()
+            if ultima is None or (datetime.now() - ultima).total_seconds() >= intervalo_segundos:
+                try:
+                    atualizar_odds_cache()
+                except Exception as e:
+                    print(f"Erro ao atualizar o cache de odds: {e}")
+        time.sleep(min(intervalo_segundos, 60))
+
+def iniciar_atualizacao_automatica(intervalo_segundos: float = 3600):
+    """
+    Inicia (uma única vez por processo) o job em background que mantém o cache de
+    odds atualizado. Entre todos os processos, apenas um (o que obtém o lock do
+    refresher) faz as atualizações. Se não houver snapshot ou ele estiver vencido,
+    atualiza já.
+    """
+    global _refresh_thread
+    with _thread_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(
+            target=_loop_atualizacao, args=(intervalo_segundos,), name='odds-cache-refresh', daemon=True
+        )
+        _refresh_thread.start()
@@ -0,0 +1,322 @@
+# settlement_journal.py (JOURNAL WRITE-AHEAD PARA LIQUIDAÇÃO DE APOSTAS)
+
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import db_manager
+from db_manager import liquidar_exposicao, registrar_exposicao_pendente
+
+# Situação de cada entrada do journal
+PENDENTE = 'PENDENTE'    # registrada, ainda não aplicada
+APLICADA = 'APLICADA'    # aposta e saldo atualizados
+IGNORADA = 'IGNORADA'    # a aposta mudou de status por fora do lote; nada foi aplicado
+REVERTIDA = 'REVERTIDA'  # aplicada e depois desfeita no rollback
+
+# Status de cada lote
+LOTE_PENDENTE = 'PENDENTE'
+LOTE_CONCLUIDO = 'CONCLUIDO'
+LOTE_REVERTIDO = 'REVERTIDO'
+
+# O dono renova o heartbeat a cada entrada aplicada (bem abaixo de 1s); um lote PENDENTE
+# sem renovação por este tempo é considerado parado. Fica acima do timeout padrão
+# do sqlite (5s) para que uma espera pelo lock do banco não passe o lote a outro dono.
+TEMPO_LEASE_SEGUNDOS = 10
+
+_recuperacao_lock = threading.Lock()
+_recuperacao_executada = False
+
+
+def _conectar():
+    # Transações explícitas (BEGIN IMMEDIATE) para que aposta, saldo e journal mudem juntos
+    return sqlite3.connect(db_manager.DATABASE_NAME, isolation_level=None)
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec='microseconds')
+
+def novo_dono() -> str:
+    """Identificador único do worker que cria ou assume um lote."""
+    return uuid.uuid4().hex
+
+def _gravar_saldo(cursor, casa: str, delta: float):
+    # Mesma semântica de update_saldo (remove e insere), lendo o saldo dentro da transação
+    cursor.execute("SELECT saldo FROM saldos WHERE casa = ? ORDER BY data_atualizacao DESC LIMIT 1", (casa,))
+    result = cursor.fetchone()
+    novo_saldo = (result[0] if result else 0.00) + delta
+
+    cursor.execute("DELETE FROM saldos WHERE casa = ?", (casa,))
+    cursor.execute("INSERT INTO saldos (casa, saldo, data_atualizacao) VALUES (?, ?, ?)",
+                   (casa, novo_saldo, datetime.now().isoformat()))
+
+def _renovar_heartbeat(cursor, lote_id: int, dono: str) -> bool:
+    # Dentro da transação: confirma que o lote ainda é deste dono e renova o heartbeat
+    cursor.execute("""
+        UPDATE lotes_liquidacao SET heartbeat = ?
+        WHERE id = ? AND dono = ? AND status = ?
+    """, (_agora(), lote_id, dono, LOTE_PENDENTE))
+    return cursor.rowcount == 1
+
+def registrar_lote(liquidacoes: list, dono: str) -> int:
+    """
+    Grava no journal as mudanças pretendidas de um lote antes de aplicá-las.
+    Cada liquidação é um dict com aposta_id, status, valor_retorno e status_anterior
+    (o status que o chamador viu ao decidir o resultado; padrão AGUARDANDO).
+    Se a aposta já não está nesse status (ex.: liquidada manualmente nesse meio
+    tempo), a entrada é gravada como IGNORADA e nunca é aplicada.
+    O lote fica PENDENTE e pertence a `dono`. Retorna o ID do lote.
+    """
+    conn = _conectar()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("INSERT INTO lotes_liquidacao (status, dono, heartbeat, data_criacao) VALUES (?, ?, ?, ?)",
+                       (LOTE_PENDENTE, dono, _agora(), datetime.now().isoformat()))
+        lote_id = cursor.lastrowid
+
+        for liquidacao in liquidacoes:
+            aposta_id = int(liquidacao['aposta_id'])
+            cursor.execute("SELECT casa, status, valor_retorno FROM apostas WHERE id = ?", (aposta_id,))
+            aposta = cursor.fetchone()
+            if aposta is None:
+                raise ValueError(f"Aposta {aposta_id} não encontrada para liquidação.")
+
+            casa, status_atual, valor_retorno_anterior = aposta
+            status_anterior = liquidacao.get('status_anterior', 'AGUARDANDO')
+            situacao = PENDENTE if status_atual == status_anterior else IGNORADA
+            cursor.execute("""
+                INSERT INTO journal_liquidacao (lote_id, aposta_id, casa, status_anterior, valor_retorno_anterior, status_novo, valor_retorno_novo, situacao)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (lote_id, aposta_id, casa, status_anterior, valor_retorno_anterior,
+                  liquidacao['status'], float(liquidacao['valor_retorno']), situacao))
+
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return lote_id
+
+def _aplicar_entrada(cursor, lote_id: int, dono: str, entrada: tuple):
+    """
+    Aplica uma entrada em uma única transação (aposta, saldo e journal).
+    Retorna a situação gravada (APLICADA/IGNORADA), None se outro worker já a
+    processou, ou False se o lote não pertence mais a `dono`.
+    """
+    entrada_id, aposta_id, casa, status_anterior, status_novo, valor_retorno_novo = entrada
+
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        if not _renovar_heartbeat(cursor, lote_id, dono):
+            cursor.execute("ROLLBACK")
+            return False
+
+        # Aplica somente se a aposta ainda está como no momento do registro
+        cursor.execute("""
+            UPDATE apostas SET status = ?, valor_retorno = ?
+            WHERE id = ? AND status = ?
+        """, (status_novo, valor_retorno_novo, aposta_id, status_anterior))
+
+        if cursor.rowcount == 1:
+            _gravar_saldo(cursor, casa, valor_retorno_novo)
+            situacao = APLICADA
+        else:
+            situacao = IGNORADA
+
+        # Só grava se a entrada ainda está PENDENTE (um replay concorrente pode tê-la aplicado)
+        cursor.execute("UPDATE journal_liquidacao SET situacao = ? WHERE id = ? AND situacao = ?",
+                       (situacao, entrada_id, PENDENTE))
+        if cursor.rowcount != 1:
+            cursor.execute("ROLLBACK")
+            return None
+
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+    if situacao == APLICADA and status_novo != 'AGUARDANDO':
+        liquidar_exposicao(aposta_id)
+    return situacao
+
+def aplicar_lote(lote_id: int, dono: str) -> int:
+    """
+    Aplica as entradas PENDENTE de um lote que pertence a `dono`. Cada entrada é
+    gravada em uma única transação, então reaplicar um lote interrompido nunca
+    credita duas vezes. Para se o lote passar a outro dono, e só marca o lote como
+    CONCLUIDO se ainda for o dono. Retorna quantas entradas foram aplicadas.
+    """
+    conn = _conectar()
+    cursor = conn.cursor()
+    aplicadas = 0
+
+    try:
+        cursor.execute("""
+            SELECT id, aposta_id, casa, status_anterior, status_novo, valor_retorno_novo
+            FROM journal_liquidacao WHERE lote_id = ? AND situacao = ? ORDER BY id
+        """, (lote_id, PENDENTE))
+        entradas = cursor.fetchall()
+
+        for entrada in entradas:
+            situacao = _aplicar_entrada(cursor, lote_id, dono, entrada)
+            if situacao is False:
+                return aplicadas
+            if situacao == APLICADA:
+                aplicadas += 1
+
+        cursor.execute("""
+            UPDATE lotes_liquidacao SET status = ?, data_conclusao = ?
+            WHERE id = ? AND dono = ? AND status = ?
+        """, (LOTE_CONCLUIDO, datetime.now().isoformat(), lote_id, dono, LOTE_PENDENTE))
+    finally:
+        conn.close()
+
+    return aplicadas
+
+def reverter_lote(lote_id: int, dono: str) -> int:
+    """
+    Desfaz as entradas já APLICADA de um lote que pertence a `dono`: devolve a
+    aposta ao status anterior e estorna o crédito do saldo. Uma aposta que mudou de
+    status depois da liquidação não é revertida. Retorna quantas foram revertidas.
+    """
+    conn = _conectar()
+    cursor = conn.cursor()
+    revertidas = 0
+
+    try:
+        cursor.execute("""
+            SELECT id, aposta_id, casa, status_anterior, valor_retorno_anterior, status_novo, valor_retorno_novo
+            FROM journal_liquidacao WHERE lote_id = ? AND situacao = ? ORDER BY id DESC
+        """, (lote_id, APLICADA))
+        entradas = cursor.fetchall()
+
+        for entrada_id, aposta_id, casa, status_anterior, valor_retorno_anterior, status_novo, valor_retorno_novo in entradas:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if not _renovar_heartbeat(cursor, lote_id, dono):
+                    cursor.execute("ROLLBACK")
+                    return revertidas
+
+                cursor.execute("UPDATE apostas SET status = ?, valor_retorno = ? WHERE id = ? AND status = ?",
+                               (status_anterior, valor_retorno_anterior, aposta_id, status_novo))
+                if cursor.rowcount != 1:
+                    cursor.execute("ROLLBACK")
+                    continue
+
+                cursor.execute("UPDATE journal_liquidacao SET situacao = ? WHERE id = ? AND situacao = ?",
+                               (REVERTIDA, entrada_id, APLICADA))
+                if cursor.rowcount != 1:
+                    cursor.execute("ROLLBACK")
+                    continue
+
+                _gravar_saldo(cursor, casa, -valor_retorno_novo)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+            revertidas += 1
+            if status_anterior == 'AGUARDANDO':
+                registrar_exposicao_pendente(aposta_id)
+
+        cursor.execute("BEGIN IMMEDIATE")
+        if _renovar_heartbeat(cursor, lote_id, dono):
+            cursor.execute("UPDATE journal_liquidacao SET situacao = ? WHERE lote_id = ? AND situacao = ?",
+                           (IGNORADA, lote_id, PENDENTE))
+            cursor.execute("UPDATE lotes_liquidacao SET status = ?, data_conclusao = ? WHERE id = ?",
+                           (LOTE_REVERTIDO, datetime.now().isoformat(), lote_id))
+        cursor.execute("COMMIT")
+    finally:
+        conn.close()
+
+    return revertidas
+
+def get_lotes_parados(tempo_lease: float = TEMPO_LEASE_SEGUNDOS) -> list:
+    """IDs dos lotes PENDENTE cujo dono não renova o heartbeat há mais de `tempo_lease` segundos."""
+    limite = (datetime.now() - timedelta(seconds=tempo_lease)).isoformat(timespec='microseconds')
+
+    conn = _conectar()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT id FROM lotes_liquidacao
+        WHERE status = ? AND (heartbeat IS NULL OR heartbeat < ?) ORDER BY id
+    """, (LOTE_PENDENTE, limite))
+    lotes = [row[0] for row in cursor.fetchall()]
+
+    conn.close()
+    return lotes
+
+def assumir_lote(lote_id: int, dono: str, tempo_lease: float = TEMPO_LEASE_SEGUNDOS) -> bool:
+    """Transfere um lote parado para `dono`. Retorna False se ele está vivo ou já foi assumido."""
+    limite = (datetime.now() - timedelta(seconds=tempo_lease)).isoformat(timespec='microseconds')
+
+    conn = _conectar()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            UPDATE lotes_liquidacao SET dono = ?, heartbeat = ?
+            WHERE id = ? AND status = ? AND (heartbeat IS NULL OR heartbeat < ?)
+        """, (dono, _agora(), lote_id, LOTE_PENDENTE, limite))
+        assumido = cursor.rowcount == 1
+        cursor.execute("COMMIT")
+    finally:
+        conn.close()
+
+    return assumido
+
+def recuperar_lotes_pendentes(modo: str = 'replay', tempo_lease: float = TEMPO_LEASE_SEGUNDOS) -> int:
+    """
+    Recupera os lotes parados (ex.: queda no meio da automação). Lotes cujo dono
+    ainda renova o heartbeat não são tocados.
+    modo='replay' conclui as entradas que faltam; modo='rollback' desfaz as já aplicadas.
+    Só os lotes parados são lidos, então o custo é proporcional ao tamanho do lote.
+    Retorna o número de lotes recuperados.
+    """
+    if modo not in ('replay', 'rollback'):
+        raise ValueError(f"Modo de recuperação inválido: {modo}")
+
+    recuperados = 0
+    for lote_id in get_lotes_parados(tempo_lease):
+        dono = novo_dono()
+        if not assumir_lote(lote_id, dono, tempo_lease):
+            continue
+
+        if modo == 'replay':
+            aplicar_lote(lote_id, dono)
+        else:
+            reverter_lote(lote_id, dono)
+        recuperados += 1
+
+    return recuperados
+
+def contar_lotes_pendentes() -> int:
+    """Quantidade de lotes PENDENTE (parados ou com dono ativo)."""
+    conn = _conectar()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COUNT(*) FROM lotes_liquidacao WHERE status = ?", (LOTE_PENDENTE,))
+    qtd = cursor.fetchone()[0]
+
+    conn.close()
+    return qtd
+
+def recuperar_na_inicializacao(modo: str = 'replay') -> int:
+    """
+    Executa recuperar_lotes_pendentes até que não reste nenhum lote PENDENTE.
+    Um lote de um processo que acabou de cair ainda está dentro do lease e não é
+    recuperado agora; por isso a verificação só é desligada quando não sobra lote
+    PENDENTE, e as chamadas seguintes (ex.: próximos reruns) o recuperam.
+    """
+    global _recuperacao_executada
+    with _recuperacao_lock:
+        if _recuperacao_executada:
+            return 0
+        recuperados = recuperar_lotes_pendentes(modo)
+        _recuperacao_executada = contar_lotes_pendentes() == 0
+        return recuperados
@@ -0,0 +1,259 @@
+# staking.py (ESTRATÉGIAS DE STAKE E BACKTEST VETORIZADO)
+
+import numpy as np
+import pandas as pd
+
+# Mapeia o resultado (1X2) para a coluna de odd correspondente no feed de odds
+RESULTADOS_ODDS = {'1': 'Odd_1', 'X': 'Odd_X', '2': 'Odd_2'}
+
+ESTRATEGIAS = ['Fixa', 'Percentual', 'Kelly']
+
+# Faixas de odd usadas na calibração das probabilidades do histórico
+FAIXAS_ODD = [1.50, 2.00, 3.00]
+# Peso (em vitórias esperadas) da hipótese inicial "odd justa" antes de haver histórico
+PESO_PRIOR_CALIBRACAO = 5.00
+
+
+# --- Estratégias de Stake (aposta individual) ---
+
+def stake_fixa(banca: float, valor: float) -> float:
+    """Stake fixa: aposta sempre o mesmo valor, limitado ao saldo disponível."""
+    if banca <= 0:
+        return 0.00
+    return float(min(valor, banca))
+
+def stake_percentual(banca: float, percentual: float) -> float:
+    """Stake percentual: aposta uma porcentagem fixa da banca atual."""
+    if banca <= 0:
+        return 0.00
+    return float(banca * percentual / 100)
+
+def fracao_kelly(prob: float, odd: float) -> float:
+    """
+    Fração ótima de Kelly para odd decimal: f* = (p * odd - 1) / (odd - 1).
+    Retorna 0 quando não há valor esperado positivo (edge <= 0).
+    """
+    if odd <= 1:
+        return 0.00
+    return float(max((prob * odd - 1) / (odd - 1), 0.00))
+
+def stake_kelly(banca: float, prob: float, odd: float, fracao: float = 0.25) -> float:
+    """Stake por Kelly fracionado: aposta fracao * f* da banca atual."""
+    if banca <= 0:
+        return 0.00
+    return float(banca * min(fracao * fracao_kelly(prob, odd), 1.00))
+
+def sugerir_stakes(banca: float, odd: float, prob: float = None, valor_fixo: float = 10.00,
+                   percentual: float = 2.00, fracao: float = 0.25) -> dict:
+    """
+    Retorna a stake sugerida por cada estratégia para uma aposta.
+    Kelly só é sugerido quando há probabilidade estimada (prob não é None).
+    """
+    sugestoes = {
+        'Fixa': stake_fixa(banca, valor_fixo),
+        'Percentual': stake_percentual(banca, percentual),
+    }
+    if prob is not None:
+        sugestoes['Kelly'] = stake_kelly(banca, prob, odd, fracao)
+    return sugestoes
+
+
+# --- Estimativa de Edge a partir do feed de odds ---
+
+def estimar_probabilidades(df_odds: pd.DataFrame) -> pd.DataFrame:
+    """
+    Estima a probabilidade "justa" de cada resultado (1, X, 2) por evento.
+    Usa a média das probabilidades implícitas (1/odd) entre as casas e remove a
+    margem (overround) normalizando para somar 1. Adiciona as colunas Prob_* e
+    Edge_* (valor esperado por unidade apostada: prob * odd - 1).
+    """
+    if df_odds.empty:
+        return df_odds.copy()
+
+    df = df_odds.copy()
+    colunas_odd = list(RESULTADOS_ODDS.values())
+    implicitas = 1 / df[colunas_odd].astype(float)
+    implicitas['ID_Evento'] = df['ID_Evento']
+
+    consenso = implicitas.groupby('ID_Evento', observed=True)[colunas_odd].mean()
+    consenso = consenso.div(consenso.sum(axis=1), axis=0)
+    consenso.columns = [f'Prob_{r}' for r in RESULTADOS_ODDS]
+
+    df = df.merge(consenso, left_on='ID_Evento', right_index=True, how='left')
+    for resultado, coluna in RESULTADOS_ODDS.items():
+        df[f'Edge_{resultado}'] = df[f'Prob_{resultado}'] * df[coluna] - 1
+
+    return df
+
+def prob_resultado(row: pd.Series, resultado: str) -> float:
+    """
+    Probabilidade estimada de um resultado 1X2 ('1', 'X' ou '2') em um evento
+    (linha já processada por estimar_probabilidades).
+    """
+    if resultado not in RESULTADOS_ODDS:
+        raise ValueError(f"Resultado 1X2 inválido: {resultado}")
+    return float(row[f'Prob_{resultado}'])
+
+
+# --- Preparação dos dados para Backtest ---
+
+def preparar_historico(df_apostas: pd.DataFrame):
+    """
+    Extrai (odds, probs, resultados) das apostas resolvidas como GREEN/RED, em ordem
+    cronológica. Como o histórico não guarda a probabilidade estimada, a
+    probabilidade implícita de cada aposta é calibrada pela taxa de acerto das
+    apostas ANTERIORES da mesma faixa de odd (sem olhar o futuro). Sem histórico
+    na faixa, a calibração parte de 1 (odd justa, edge zero).
+    """
+    vazio = (np.empty(0), np.empty(0), np.empty(0, dtype=bool))
+    if df_apostas.empty or 'Status' not in df_apostas.columns:
+        return vazio
+
+    df = df_apostas[df_apostas['Status'].isin(['GREEN', 'RED'])]
+    if df.empty:
+        return vazio
+
+    df = df.sort_values('Data_Registro')
+    odds = pd.to_numeric(df['Odd'], errors='coerce').fillna(1.0).to_numpy(dtype=float)
+    resultados = (df['Status'] == 'GREEN').to_numpy()
+
+    implicitas = 1 / odds
+    calib = pd.DataFrame({
+        'Faixa': np.digitize(odds, FAIXAS_ODD),
+        'Vitorias': resultados.astype(float),
+        'Implicita': implicitas,
+    })
+    acumulado = calib.groupby('Faixa')[['Vitorias', 'Implicita']].cumsum()
+    vitorias_anteriores = (acumulado['Vitorias'] - calib['Vitorias']).to_numpy()
+    implicitas_anteriores = (acumulado['Implicita'] - calib['Implicita']).to_numpy()
+
+    calibracao = (vitorias_anteriores + PESO_PRIOR_CALIBRACAO) / (implicitas_anteriores + PESO_PRIOR_CALIBRACAO)
+    probs = np.clip(implicitas * calibracao, 0.00, 0.99)
+
+    return odds, probs, resultados
+
+def preparar_simulacao(df_odds: pd.DataFrame, seed=None):
+    """
+    Extrai (odds, probs, resultados) do feed de odds: para cada linha (casa/evento)
+    escolhe o resultado 1X2 de maior edge, em ordem de data do jogo. O desfecho é
+    sorteado uma vez por evento (ID_Evento), então as casas de um mesmo jogo
+    liquidam de forma coerente.
+    """
+    if df_odds.empty:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=bool)
+
+    df = estimar_probabilidades(df_odds).sort_values('Data_Hora')
+    chaves = list(RESULTADOS_ODDS)
+
+    edges = df[[f'Edge_{r}' for r in chaves]].to_numpy(dtype=float)
+    escolha = edges.argmax(axis=1)
+    linhas = np.arange(len(df))
+
+    odds = df[[RESULTADOS_ODDS[r] for r in chaves]].to_numpy(dtype=float)[linhas, escolha]
+    probs = df[[f'Prob_{r}' for r in chaves]].to_numpy(dtype=float)[linhas, escolha]
+
+    # Um sorteio por evento: as probabilidades de consenso são iguais entre as casas
+    eventos, posicao_evento = np.unique(df['ID_Evento'].to_numpy(dtype=str), return_inverse=True)
+    linha_evento = np.zeros(len(eventos), dtype=int)
+    linha_evento[posicao_evento] = linhas  # qualquer linha do evento serve
+    probs_evento = df[[f'Prob_{r}' for r in chaves]].to_numpy(dtype=float)[linha_evento]
+
+    rng = np.random.default_rng(seed)
+    sorteio = rng.random(len(eventos))
+    resultado_evento = np.minimum((sorteio[:, None] > np.cumsum(probs_evento, axis=1)).sum(axis=1), len(chaves) - 1)
+    resultados = escolha == resultado_evento[posicao_evento]
+
+    return odds, probs, resultados
+
+
+# --- Backtest Vetorizado ---
+
+def simular_bancas(odds, probs, resultados, estrategia: str, parametros, banca_inicial: float = 1000.00):
+    """
+    Simula a evolução da banca para vários parâmetros de uma estratégia de uma vez.
+    Retorna (bancas, stakes), matrizes (n_parametros, n_apostas + 1) e
+    (n_parametros, n_apostas). Bancas que zeram permanecem zeradas.
+    """
+    odds = np.asarray(odds, dtype=float)
+    probs = np.asarray(probs, dtype=float)
+    resultados = np.asarray(resultados, dtype=bool)
+    parametros = np.asarray(parametros, dtype=float).reshape(-1, 1)
+
+    # Retorno líquido por unidade apostada em cada aposta
+    retorno_unit = np.where(resultados, odds - 1, -1.0)
+    inicio = np.full((parametros.shape[0], 1), banca_inicial, dtype=float)
+
+    if estrategia == 'Fixa':
+        # A stake é limitada pela banca corrente, então percorre as apostas em ordem
+        # (vetorizado entre os parâmetros)
+        valores = parametros[:, 0]
+        bancas = np.empty((parametros.shape[0], len(odds) + 1), dtype=float)
+        stakes = np.empty((parametros.shape[0], len(odds)), dtype=float)
+        bancas[:, 0] = banca_inicial
+        for i in range(len(odds)):
+            stakes[:, i] = np.minimum(valores, np.maximum(bancas[:, i], 0.00))
+            bancas[:, i + 1] = bancas[:, i] + stakes[:, i] * retorno_unit[i]
+        return bancas, stakes
+
+    if estrategia == 'Percentual':
+        fracoes = np.broadcast_to(parametros / 100, (parametros.shape[0], len(odds)))
+    elif estrategia == 'Kelly':
+        f_kelly = np.clip((probs * odds - 1) / np.maximum(odds - 1, 1e-9), 0.00, None)
+        fracoes = np.clip(parametros * f_kelly, 0.00, 1.00)
+    else:
+        raise ValueError(f"Estratégia desconhecida: {estrategia}")
+
+    fatores = np.clip(1 + fracoes * retorno_unit, 0.00, None)
+    bancas = np.hstack([inicio, banca_inicial * np.cumprod(fatores, axis=1)])
+    stakes = fracoes * bancas[:, :-1]
+    return bancas, stakes
+
+def grade_padrao() -> dict:
+    """Grade de parâmetros padrão para o backtest de cada estratégia."""
+    return {
+        'Fixa': np.linspace(5.00, 200.00, 100),       # R$ por aposta
+        'Percentual': np.linspace(0.25, 25.00, 100),  # % da banca
+        'Kelly': np.linspace(0.01, 1.00, 100),        # fração de Kelly
+    }
+
+def executar_backtests(odds, probs, resultados, banca_inicial: float = 1000.00, grade: dict = None) -> pd.DataFrame:
+    """
+    Executa o backtest de todas as combinações de estratégia/parâmetro e retorna
+    um DataFrame com Banca_Final, Lucro, ROI (%), Total_Apostado e Max_Drawdown (%).
+    """
+    colunas = ['Estrategia', 'Parametro', 'Banca_Final', 'Lucro', 'Total_Apostado', 'ROI', 'Max_Drawdown']
+    if len(odds) == 0:
+        return pd.DataFrame(columns=colunas)
+
+    grade = grade or grade_padrao()
+    resultados_bt = []
+
+    for estrategia, parametros in grade.items():
+        bancas, stakes = simular_bancas(odds, probs, resultados, estrategia, parametros, banca_inicial)
+
+        banca_final = bancas[:, -1]
+        lucro = banca_final - banca_inicial
+        total_apostado = stakes.sum(axis=1)
+        roi = np.divide(lucro, total_apostado, out=np.zeros_like(lucro), where=total_apostado > 0) * 100
+
+        picos = np.maximum.accumulate(bancas, axis=1)
+        drawdown = np.divide(picos - bancas, picos, out=np.zeros_like(bancas), where=picos > 0)
+
+        resultados_bt.append(pd.DataFrame({
+            'Estrategia': estrategia,
+            'Parametro': np.asarray(parametros, dtype=float),
+            'Banca_Final': banca_final,
+            'Lucro': lucro,
+            'Total_Apostado': total_apostado,
+            'ROI': roi,
+            'Max_Drawdown': drawdown.max(axis=1) * 100,
+        }))
+
+    return pd.concat(resultados_bt, ignore_index=True)[colunas]
+
+def melhores_por_estrategia(df_backtest: pd.DataFrame) -> pd.DataFrame:
+    """Seleciona o parâmetro de maior Banca_Final de cada estratégia."""
+    if df_backtest.empty:
+        return df_backtest
+    idx = df_backtest.groupby('Estrategia')['Banca_Final'].idxmax()
+    return df_backtest.loc[idx].reset_index(drop=True)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_manager
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Banco isolado por teste, com saldo inicial de R$ 100,00 na Superbet."""
+    monkeypatch.setattr(db_manager, 'DATABASE_NAME', str(tmp_path / 'bet_manager.db'))
+    monkeypatch.setattr(db_manager, '_exposure_index', None)
+    db_manager.setup_database()
+    db_manager.update_saldo('Superbet', 100.00)
+    return db_manager.DATABASE_NAME
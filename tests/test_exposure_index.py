@@ -0,0 +1,78 @@
+import pytest
+
+import db_manager
+from exposure_index import ExposureIndex
+
+
+def test_registrar_e_liquidar_atualizam_totais():
+    index = ExposureIndex()
+    index.registrar_aposta(1, 'Superbet', 'Time A vs Time B', '1X2', 2.00, 10.00)
+    index.registrar_aposta(2, 'Superbet', 'Time X vs Time Y', '1X2', 3.00, 20.00)
+
+    assert index.exposicao('Casa', 'Superbet') == {'Valor_Apostado': 30.00, 'Retorno_Potencial': 80.00, 'Qtd_Apostas': 2}
+    assert index.exposicao('Mercado', '1X2')['Qtd_Apostas'] == 2
+
+    assert index.liquidar_aposta(1) is True
+    assert index.exposicao('Casa', 'Superbet') == {'Valor_Apostado': 20.00, 'Retorno_Potencial': 60.00, 'Qtd_Apostas': 1}
+    assert 'Time A vs Time B' not in index.exposicao_por('Jogo')
+
+def test_registro_duplicado_e_liquidacao_desconhecida_sao_ignorados():
+    index = ExposureIndex()
+    index.registrar_aposta(1, 'Superbet', 'Jogo', '1X2', 2.00, 10.00)
+    index.registrar_aposta(1, 'Superbet', 'Jogo', '1X2', 2.00, 10.00)
+
+    assert index.exposicao('Casa', 'Superbet')['Qtd_Apostas'] == 1
+    assert index.liquidar_aposta(99) is False
+
+def test_limite_por_chave_tem_precedencia_sobre_o_padrao():
+    index = ExposureIndex()
+    index.definir_limite('Casa', 100.00)
+    index.definir_limite('Casa', 500.00, chave='Superbet')
+
+    assert index.limite('Casa', 'Superbet') == 500.00
+    assert index.limite('Casa', 'Sportingbet') == 100.00
+
+    index.registrar_aposta(1, 'Superbet', 'Jogo 1', '1X2', 3.00, 50.00)      # retorno 150 < 500
+    alertas = index.registrar_aposta(2, 'Sportingbet', 'Jogo 2', '1X2', 3.00, 50.00)  # retorno 150 > 100
+
+    assert len(alertas) == 1 and 'Sportingbet' in alertas[0]
+    assert index.alertas() == alertas
+
+def test_alerta_dispara_uma_vez_e_limpa_ao_cair_abaixo_do_limite():
+    index = ExposureIndex()
+    index.definir_limite('Jogo', 100.00)
+
+    assert index.registrar_aposta(1, 'Superbet', 'Jogo', '1X2', 2.00, 40.00) == []
+    assert len(index.registrar_aposta(2, 'Superbet', 'Jogo', '1X2', 2.00, 40.00)) == 1
+    # Já ativo: não dispara de novo, mas a mensagem é atualizada
+    assert index.registrar_aposta(3, 'Superbet', 'Jogo', '1X2', 2.00, 40.00) == []
+    assert '240.00' in index.alertas()[0]
+
+    index.liquidar_aposta(3)
+    index.liquidar_aposta(2)
+    assert index.alertas() == []
+
+def test_remover_limite_limpa_alerta():
+    index = ExposureIndex()
+    index.definir_limite('Casa', 10.00)
+    index.registrar_aposta(1, 'Superbet', 'Jogo', '1X2', 2.00, 10.00)
+    assert len(index.alertas()) == 1
+
+    index.definir_limite('Casa', None)
+    assert index.alertas() == []
+
+def test_dimensao_invalida():
+    with pytest.raises(ValueError):
+        ExposureIndex().definir_limite('Liga', 10.00)
+
+def test_indice_do_banco_acompanha_insert_e_liquidacao(banco):
+    index = db_manager.get_exposure_index()
+    aposta_id = db_manager.insert_aposta('Superbet', 'Liga', 'Jogo', '1X2', 2.00, 10.00)
+    assert index.exposicao('Casa', 'Superbet')['Qtd_Apostas'] == 1
+
+    db_manager.update_aposta_resultado(aposta_id, 'GREEN', 20.00)
+    assert index.exposicao('Casa', 'Superbet')['Qtd_Apostas'] == 0
+
+    # Aposta já liquidada não volta ao índice
+    db_manager.registrar_exposicao_pendente(aposta_id)
+    assert index.exposicao('Casa', 'Superbet')['Qtd_Apostas'] == 0
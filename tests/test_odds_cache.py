@@ -0,0 +1,89 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import odds_cache
+
+
+def _odds(fator=1.00):
+    return pd.DataFrame({
+        'Casa': ['Superbet', 'Sportingbet', 'Superbet'],
+        'ID_Evento': ['SIM_1', 'SIM_1', 'SIM_2'],
+        'Jogo': ['Time A vs Time B', 'Time A vs Time B', 'Time X vs Time Y'],
+        'Odd_1': [1.80 * fator, 1.85 * fator, 2.10 * fator],
+    })
+
+def _base_memmap(arr):
+    while getattr(arr, 'base', None) is not None and not isinstance(arr, np.memmap):
+        arr = arr.base
+    return arr
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(odds_cache, 'ODDS_CACHE_DIR', str(tmp_path / 'odds_cache'))
+    monkeypatch.setattr(odds_cache, '_snapshot', (None, pd.DataFrame()))
+    monkeypatch.setattr(odds_cache, 'get_all_prematch_odds', _odds)
+    return tmp_path / 'odds_cache'
+
+
+def test_snapshot_preserva_dados_e_mapeia_colunas(cache):
+    odds_cache.atualizar_odds_cache()
+    df = odds_cache.get_odds_snapshot()
+
+    pd.testing.assert_frame_equal(df.astype({c: str for c in ['Casa', 'ID_Evento', 'Jogo']}), _odds(), check_dtype=False)
+    assert isinstance(_base_memmap(df['Odd_1'].to_numpy()), np.memmap)
+    for coluna in ['Casa', 'ID_Evento', 'Jogo']:
+        assert isinstance(_base_memmap(df[coluna].array.codes), np.memmap)
+
+def test_snapshot_compartilhado_ate_nova_versao(cache):
+    odds_cache.atualizar_odds_cache()
+    primeiro = odds_cache.get_odds_snapshot()
+    assert odds_cache.get_odds_snapshot() is primeiro
+
+    odds_cache.atualizar_odds_cache()
+    assert odds_cache.get_odds_snapshot() is not primeiro
+
+def test_mantem_apenas_as_ultimas_versoes(cache):
+    versoes = [odds_cache.atualizar_odds_cache() for _ in range(4)]
+    publicadas = sorted(v for v in os.listdir(cache) if not v.startswith('.') and v != odds_cache.ARQUIVO_VERSAO)
+
+    assert publicadas == versoes[-odds_cache.VERSOES_MANTIDAS:]
+    assert odds_cache.versao_atual() == versoes[-1]
+
+def test_versao_apagada_durante_leitura_tenta_a_nova(cache, monkeypatch):
+    antiga = odds_cache.atualizar_odds_cache()
+    nova = odds_cache.atualizar_odds_cache()
+    shutil.rmtree(os.path.join(cache, antiga))
+
+    # O primeiro leitor ainda vê a versão antiga no CURRENT (já apagada)
+    leituras = iter([antiga, nova])
+    versao_atual_original = odds_cache.versao_atual
+    monkeypatch.setattr(odds_cache, 'versao_atual', lambda: next(leituras, None) or versao_atual_original())
+
+    df = odds_cache.get_odds_snapshot()
+    assert odds_cache._snapshot[0] == nova
+    assert len(df) == 3
+
+@pytest.mark.skipif(odds_cache.fcntl is None, reason="usa fcntl")
+def test_lock_bloqueante_que_falha_propaga_o_erro(cache, monkeypatch):
+    def flock_falha(*args):
+        raise OSError("lock indisponível")
+    monkeypatch.setattr(odds_cache.fcntl, 'flock', flock_falha)
+
+    with pytest.raises(OSError, match="lock indisponível"):
+        odds_cache.atualizar_odds_cache()
+
+def test_lock_do_refresher_e_exclusivo(cache):
+    dono = odds_cache._adquirir_lock_arquivo(odds_cache.LOCK_REFRESHER, bloqueante=False)
+    try:
+        assert dono is not None
+        assert odds_cache._adquirir_lock_arquivo(odds_cache.LOCK_REFRESHER, bloqueante=False) is None
+    finally:
+        odds_cache._liberar_lock_arquivo(dono)
+
+    outro = odds_cache._adquirir_lock_arquivo(odds_cache.LOCK_REFRESHER, bloqueante=False)
+    assert outro is not None
+    odds_cache._liberar_lock_arquivo(outro)
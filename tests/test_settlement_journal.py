@@ -0,0 +1,170 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import db_manager
+import settlement_journal as sj
+
+
+def _nova_aposta(jogo='Time A vs Time B', odd=2.0, valor=10.00):
+    return db_manager.insert_aposta('Superbet', 'Liga', jogo, 'Vencedor da Partida (1X2)', odd, valor)
+
+def _situacoes(banco, lote_id):
+    conn = sqlite3.connect(banco)
+    rows = conn.execute("SELECT situacao FROM journal_liquidacao WHERE lote_id = ? ORDER BY id", (lote_id,)).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+def _status_lote(banco, lote_id):
+    conn = sqlite3.connect(banco)
+    status = conn.execute("SELECT status FROM lotes_liquidacao WHERE id = ?", (lote_id,)).fetchone()[0]
+    conn.close()
+    return status
+
+def _envelhecer_lote(banco, lote_id):
+    conn = sqlite3.connect(banco)
+    antigo = (datetime.now() - timedelta(hours=1)).isoformat()
+    conn.execute("UPDATE lotes_liquidacao SET heartbeat = ? WHERE id = ?", (antigo, lote_id))
+    conn.commit()
+    conn.close()
+
+def _entradas(banco, lote_id):
+    conn = sqlite3.connect(banco)
+    rows = conn.execute("""
+        SELECT id, aposta_id, casa, status_anterior, status_novo, valor_retorno_novo
+        FROM journal_liquidacao WHERE lote_id = ? ORDER BY id
+    """, (lote_id,)).fetchall()
+    conn.close()
+    return rows
+
+
+def test_aplicar_lote_credita_saldo_e_conclui(banco):
+    aposta_id = _nova_aposta()
+    dono = sj.novo_dono()
+    lote_id = sj.registrar_lote([{'aposta_id': aposta_id, 'status': 'GREEN', 'valor_retorno': 20.00}], dono)
+
+    assert sj.aplicar_lote(lote_id, dono) == 1
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(120.00)
+    assert _situacoes(banco, lote_id) == [sj.APLICADA]
+    assert _status_lote(banco, lote_id) == sj.LOTE_CONCLUIDO
+
+def test_replay_obsoleto_nao_sobrescreve_entrada_aplicada(banco):
+    aposta_id = _nova_aposta()
+    dono = sj.novo_dono()
+    lote_id = sj.registrar_lote([{'aposta_id': aposta_id, 'status': 'GREEN', 'valor_retorno': 20.00}], dono)
+    entrada = _entradas(banco, lote_id)[0]
+
+    conn = sj._conectar()
+    try:
+        assert sj._aplicar_entrada(conn.cursor(), lote_id, dono, entrada) == sj.APLICADA
+        # Replay com a lista de entradas antiga: a entrada já foi aplicada
+        assert sj._aplicar_entrada(conn.cursor(), lote_id, dono, entrada) is None
+    finally:
+        conn.close()
+
+    assert _situacoes(banco, lote_id) == [sj.APLICADA]
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(120.00)
+
+    # O rollback ainda enxerga a entrada aplicada e estorna o crédito
+    assert sj.reverter_lote(lote_id, dono) == 1
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(100.00)
+    assert db_manager.get_all_apostas()['Status'].tolist() == ['AGUARDANDO']
+
+def test_reverter_ignora_aposta_alterada_depois(banco):
+    aposta_id = _nova_aposta()
+    dono = sj.novo_dono()
+    lote_id = sj.registrar_lote([{'aposta_id': aposta_id, 'status': 'GREEN', 'valor_retorno': 20.00}], dono)
+
+    conn = sj._conectar()
+    try:
+        sj._aplicar_entrada(conn.cursor(), lote_id, dono, _entradas(banco, lote_id)[0])
+    finally:
+        conn.close()
+    db_manager.update_aposta_resultado(aposta_id, 'CASHOUT', 15.00)
+
+    assert sj.reverter_lote(lote_id, dono) == 0
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(120.00)
+    assert db_manager.get_all_apostas()['Status'].tolist() == ['CASHOUT']
+
+def test_recuperacao_nao_toca_lote_vivo(banco):
+    aposta_id = _nova_aposta()
+    lote_id = sj.registrar_lote([{'aposta_id': aposta_id, 'status': 'GREEN', 'valor_retorno': 20.00}], sj.novo_dono())
+
+    assert sj.recuperar_lotes_pendentes() == 0
+    assert _situacoes(banco, lote_id) == [sj.PENDENTE]
+
+    _envelhecer_lote(banco, lote_id)
+    assert sj.recuperar_lotes_pendentes() == 1
+    assert _situacoes(banco, lote_id) == [sj.APLICADA]
+    assert _status_lote(banco, lote_id) == sj.LOTE_CONCLUIDO
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(120.00)
+
+def test_rollback_de_lote_interrompido(banco):
+    ids = [_nova_aposta(jogo=f"Jogo {i}") for i in range(3)]
+    dono = sj.novo_dono()
+    lote_id = sj.registrar_lote([{'aposta_id': i, 'status': 'GREEN', 'valor_retorno': 20.00} for i in ids], dono)
+
+    # Queda depois de aplicar a primeira entrada
+    conn = sj._conectar()
+    try:
+        sj._aplicar_entrada(conn.cursor(), lote_id, dono, _entradas(banco, lote_id)[0])
+    finally:
+        conn.close()
+    _envelhecer_lote(banco, lote_id)
+
+    assert sj.recuperar_lotes_pendentes(modo='rollback') == 1
+    assert _situacoes(banco, lote_id) == [sj.REVERTIDA, sj.IGNORADA, sj.IGNORADA]
+    assert _status_lote(banco, lote_id) == sj.LOTE_REVERTIDO
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(100.00)
+
+def test_aplicar_lote_de_outro_dono_nao_conclui(banco):
+    aposta_id = _nova_aposta()
+    lote_id = sj.registrar_lote([{'aposta_id': aposta_id, 'status': 'GREEN', 'valor_retorno': 20.00}], sj.novo_dono())
+
+    assert sj.aplicar_lote(lote_id, sj.novo_dono()) == 0
+    assert _situacoes(banco, lote_id) == [sj.PENDENTE]
+    assert _status_lote(banco, lote_id) == sj.LOTE_PENDENTE
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(100.00)
+
+def test_registrar_lote_com_aposta_inexistente(banco):
+    with pytest.raises(ValueError):
+        sj.registrar_lote([{'aposta_id': 999, 'status': 'GREEN', 'valor_retorno': 20.00}], sj.novo_dono())
+
+    conn = sqlite3.connect(banco)
+    assert conn.execute("SELECT COUNT(*) FROM lotes_liquidacao").fetchone()[0] == 0
+    conn.close()
+
+def test_aposta_liquidada_manualmente_antes_do_registro(banco):
+    aposta_id = _nova_aposta()
+    vista = db_manager.get_all_apostas()  # a automação lê a aposta ainda AGUARDANDO
+
+    # Liquidação manual entre a leitura e o registro do lote
+    db_manager.update_aposta_resultado(aposta_id, 'CASHOUT', 15.00)
+    db_manager.update_saldo('Superbet', 115.00)
+
+    liquidacoes = [{'aposta_id': row['ID_Aposta'], 'status': 'GREEN', 'valor_retorno': 20.00,
+                    'status_anterior': row['Status']} for _, row in vista.iterrows()]
+    dono = sj.novo_dono()
+    lote_id = sj.registrar_lote(liquidacoes, dono)
+
+    assert _situacoes(banco, lote_id) == [sj.IGNORADA]
+    assert sj.aplicar_lote(lote_id, dono) == 0
+    assert _status_lote(banco, lote_id) == sj.LOTE_CONCLUIDO
+    assert db_manager.get_all_apostas()['Status'].tolist() == ['CASHOUT']
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(115.00)
+
+def test_restart_dentro_do_lease_recupera_depois(banco, monkeypatch):
+    monkeypatch.setattr(sj, '_recuperacao_executada', False)
+    aposta_id = _nova_aposta()
+    # Processo anterior caiu logo após registrar o lote: o heartbeat ainda está no lease
+    lote_id = sj.registrar_lote([{'aposta_id': aposta_id, 'status': 'GREEN', 'valor_retorno': 20.00}], sj.novo_dono())
+
+    assert sj.recuperar_na_inicializacao() == 0
+    assert sj._recuperacao_executada is False
+
+    _envelhecer_lote(banco, lote_id)
+    assert sj.recuperar_na_inicializacao() == 1
+    assert sj._recuperacao_executada is True
+    assert _status_lote(banco, lote_id) == sj.LOTE_CONCLUIDO
+    assert db_manager.get_latest_saldo('Superbet') == pytest.approx(120.00)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import staking
+
+
+def test_fracao_kelly_formula():
+    # f* = (p * odd - 1) / (odd - 1)
+    assert staking.fracao_kelly(0.50, 3.00) == pytest.approx(0.25)
+    assert staking.fracao_kelly(0.60, 2.00) == pytest.approx(0.20)
+
+def test_fracao_kelly_sem_edge_e_zero():
+    assert staking.fracao_kelly(0.50, 2.00) == 0.00
+    assert staking.fracao_kelly(0.30, 2.00) == 0.00
+    assert staking.fracao_kelly(0.90, 1.00) == 0.00
+
+def test_simular_bancas_fixa_limita_stake_pela_banca():
+    # Banca 1000, stake 150: seis derrotas (sobra 100) e uma vitória a 2.0 com stake 100
+    odds = np.full(7, 2.00)
+    resultados = np.array([False] * 6 + [True])
+    bancas, stakes = staking.simular_bancas(odds, np.full(7, 0.5), resultados, 'Fixa', [150.00], 1000.00)
+
+    assert stakes[0].tolist() == [150.00] * 6 + [100.00]
+    assert bancas[0].tolist() == [1000.00, 850.00, 700.00, 550.00, 400.00, 250.00, 100.00, 200.00]
+
+def test_executar_backtests_fixa_metricas_coerentes():
+    odds = np.full(7, 2.00)
+    resultados = np.array([False] * 6 + [True])
+    grade = {'Fixa': np.array([150.00])}
+    linha = staking.executar_backtests(odds, np.full(7, 0.5), resultados, 1000.00, grade).iloc[0]
+
+    assert linha['Banca_Final'] == pytest.approx(200.00)
+    assert linha['Total_Apostado'] == pytest.approx(1000.00)
+    assert linha['Lucro'] == pytest.approx(-800.00)
+    assert linha['ROI'] == pytest.approx(-80.00)
+
+def test_simular_bancas_fixa_banca_zerada_para_de_apostar():
+    odds = np.full(3, 2.00)
+    resultados = np.array([False, True, True])
+    bancas, stakes = staking.simular_bancas(odds, np.full(3, 0.5), resultados, 'Fixa', [100.00], 100.00)
+
+    assert stakes[0].tolist() == [100.00, 0.00, 0.00]
+    assert bancas[0].tolist() == [100.00, 0.00, 0.00, 0.00]
+
+def test_preparar_historico_calibra_apenas_com_apostas_anteriores():
+    historico = pd.DataFrame({
+        'Status': ['GREEN', 'GREEN', 'RED', 'GREEN'],
+        'Odd': [2.00, 2.00, 2.00, 2.00],
+        'Data_Registro': pd.date_range('2026-01-01', periods=4),
+    })
+    odds, probs, resultados = staking.preparar_historico(historico)
+
+    prior = staking.PESO_PRIOR_CALIBRACAO
+    # Primeira aposta: sem histórico, odd justa
+    assert probs[0] == pytest.approx(0.50)
+    # Cada aposta usa só as anteriores: (vitórias + prior) / (soma das implícitas + prior)
+    assert probs[1] == pytest.approx(0.50 * (1 + prior) / (0.5 + prior))
+    assert probs[2] == pytest.approx(0.50 * (2 + prior) / (1.0 + prior))
+    assert probs[3] == pytest.approx(0.50 * (2 + prior) / (1.5 + prior))
+
+def test_preparar_historico_nao_depende_do_futuro():
+    base = pd.DataFrame({
+        'Status': ['GREEN', 'RED', 'GREEN'],
+        'Odd': [1.80, 2.50, 2.00],
+        'Data_Registro': pd.date_range('2026-01-01', periods=3),
+    })
+    futuro = pd.DataFrame({'Status': ['RED'] * 5, 'Odd': [2.00] * 5,
+                           'Data_Registro': pd.date_range('2026-02-01', periods=5)})
+
+    _, probs_base, _ = staking.preparar_historico(base)
+    _, probs_estendido, _ = staking.preparar_historico(pd.concat([base, futuro], ignore_index=True))
+
+    assert probs_estendido[:3] == pytest.approx(probs_base)